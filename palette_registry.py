@@ -0,0 +1,255 @@
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from PIL import ImageColor
+
+from color_palettes import COLOR_PALETTES
+
+CACHE_FILENAME = ".pilfx_palettes.cache"
+CACHE_VERSION = 1
+
+RGB = Tuple[int, int, int]
+
+
+class Palette(NamedTuple):
+    name: str
+    colors: Tuple[str, ...]
+    rgb: Tuple[RGB, ...]
+
+
+def hex_to_rgb(hex_color: str) -> RGB:
+    """Convert HEX color value to RGB"""
+    value = hex_color.strip().lstrip('#')
+    try:
+        if len(value) == 6:
+            return tuple(int(value[i:i+2], 16) for i in (0, 2, 4))
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid hexadecimal color code: {hex_color}")
+
+
+def rgb_to_hex(rgb: Iterable[int]) -> str:
+    """Convert RGB color value to HEX"""
+    red, green, blue = (int(c) for c in rgb)
+    for component in (red, green, blue):
+        if component < 0 or component > 255:
+            raise ValueError(f"Invalid RGB color value: {(red, green, blue)}")
+    return f"#{red:02X}{green:02X}{blue:02X}"
+
+
+def parse_color(color) -> RGB:
+    """Convert a color specifier (same formats as --set_colors) or an RGB triplet to RGB"""
+    if isinstance(color, str):
+        color = ImageColor.getrgb(color)[:3]
+    return hex_to_rgb(rgb_to_hex(color))
+
+
+def make_palette(name: str, colors: Iterable) -> Palette:
+    """Build a palette from color specifiers or RGB triplets, parsing each color once."""
+    if not isinstance(name, str) or not name:
+        raise ValueError(f"Invalid color palette name: {name!r}")
+    rgb = tuple(parse_color(color) for color in colors)
+    if not rgb:
+        raise ValueError(f"Color palette {name} contains no colors")
+    return Palette(name, tuple(rgb_to_hex(c) for c in rgb), rgb)
+
+
+def palettes_from_cache(entry, stat: os.stat_result) -> Optional[List[Palette]]:
+    """Rebuild palettes from a cache entry, None if the entry is stale or invalid."""
+    try:
+        if entry["mtime"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+            return None
+        palettes = []
+        for p in entry["palettes"]:
+            name, colors, rgb = p["name"], p["colors"], p["rgb"]
+            # Cached colors are already parsed, only check the shape of the entry
+            if not isinstance(name, str) or not colors or len(colors) != len(rgb):
+                return None
+            palettes.append(Palette(name, tuple(colors), tuple(map(tuple, rgb))))
+        return palettes
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def read_gpl(path: Path) -> List[Palette]:
+    """Read a GIMP palette (.gpl) file."""
+    lines = path.read_text(encoding="utf-8", errors="replace").splitlines()
+    if not lines or not lines[0].strip().startswith("GIMP Palette"):
+        raise ValueError("Missing 'GIMP Palette' header")
+
+    name = path.stem
+    colors = []
+    for line in lines[1:]:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("Name:"):
+            name = line[len("Name:"):].strip() or name
+            continue
+        if line.startswith("Columns:"):
+            continue
+        fields = line.split()
+        if len(fields) < 3:
+            raise ValueError(f"Invalid color entry: {line}")
+        colors.append(tuple(int(c) for c in fields[:3]))
+
+    return [make_palette(name, colors)]
+
+
+def read_act(path: Path) -> List[Palette]:
+    """Read an Adobe Color Table (.act) file."""
+    data = path.read_bytes()
+    if len(data) not in (768, 772):
+        raise ValueError(f"Invalid ACT file size: {len(data)} bytes")
+
+    count = 256
+    if len(data) == 772:
+        # Optional trailer holds the number of used colors (big-endian)
+        count = int.from_bytes(data[768:770], "big") or 256
+        count = min(count, 256)
+
+    colors = [tuple(data[i:i+3]) for i in range(0, count * 3, 3)]
+    return [make_palette(path.stem, colors)]
+
+
+def read_json(path: Path) -> List[Palette]:
+    """
+    Read a JSON palette file.
+    Either a single palette {"name": "...", "colors": [...]} or a mapping of
+    palette names to color lists in the same format as COLOR_PALETTES.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object")
+
+    if "colors" in data:
+        if not set(data) <= {"name", "colors"}:
+            raise ValueError("Single palette files may only contain 'name' and 'colors'")
+        if not isinstance(data["colors"], list):
+            raise ValueError("Expected a list of colors")
+        return [make_palette(data.get("name") or path.stem, data["colors"])]
+
+    palettes = []
+    for name, colors in data.items():
+        if not isinstance(colors, list):
+            raise ValueError(f"Expected a list of colors for palette {name}")
+        palettes.append(make_palette(name, colors))
+    return palettes
+
+
+PALETTE_READERS = {
+    ".gpl": read_gpl,
+    ".act": read_act,
+    ".json": read_json,
+}
+
+
+class PaletteRegistry:
+    """
+    Case-insensitive index of color palettes.
+    Built-in palettes from COLOR_PALETTES are always available. Palette files in
+    palette_dir (.gpl, .act, .json) are compiled once and cached in the same
+    directory, files are only parsed again when their modification time or size changes.
+    Palettes loaded from files replace built-in palettes with the same name.
+    """
+    def __init__(self, palette_dir: Optional[str] = None, cache_file: Optional[str] = None):
+        self.palette_dir = Path(palette_dir) if palette_dir else None
+        self.cache_file = Path(cache_file) if cache_file else None
+        if self.cache_file is None and self.palette_dir is not None:
+            self.cache_file = self.palette_dir / CACHE_FILENAME
+        self.index: Dict[str, Palette] = {}
+        # Palette file each palette name was loaded from, used to report name collisions
+        self.sources: Dict[str, str] = {}
+
+        for name, colors in COLOR_PALETTES.items():
+            self.add(make_palette(name, colors))
+
+        if self.palette_dir is not None and self.palette_dir.is_dir():
+            self.load_directory()
+
+    def __contains__(self, name: str) -> bool:
+        return name.lower() in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def get(self, name: str) -> Optional[Palette]:
+        """Return the palette matching name (case-insensitive) or None."""
+        return self.index.get(name.lower())
+
+    def add(self, palette: Palette):
+        self.index[palette.name.lower()] = palette
+
+    def palette_files(self) -> List[Path]:
+        """Get a sorted list of supported palette files in the palette directory."""
+        return sorted(file for file in self.palette_dir.iterdir()
+                      if file.is_file() and file.suffix.lower() in PALETTE_READERS)
+
+    def load_directory(self):
+        """Load palette files, reusing cached entries for unchanged files."""
+        cache = self.read_cache()
+        entries = {}
+        changed = False
+
+        for file in self.palette_files():
+            stat = file.stat()
+            entry = cache.get(file.name)
+            palettes = palettes_from_cache(entry, stat)
+            if palettes is None:
+                changed = True
+                try:
+                    palettes = PALETTE_READERS[file.suffix.lower()](file)
+                except (OSError, TypeError, ValueError) as e:
+                    # Not cached so the error is reported again until the file is fixed
+                    logging.error(f"Invalid color palette file {file.name}: {e}")
+                    continue
+                entry = {
+                    "mtime": stat.st_mtime_ns,
+                    "size": stat.st_size,
+                    "palettes": [p._asdict() for p in palettes],
+                }
+            entries[file.name] = entry
+
+            for palette in palettes:
+                key = palette.name.lower()
+                if key in self.sources:
+                    logging.warning(f"Color palette {palette.name} in {file.name} replaces "
+                                    f"palette of the same name in {self.sources[key]}")
+                self.sources[key] = file.name
+                self.add(palette)
+
+        if changed or entries.keys() != cache.keys():
+            self.write_cache(entries)
+
+    def read_cache(self) -> dict:
+        if self.cache_file is None or not self.cache_file.is_file():
+            return {}
+        try:
+            with open(self.cache_file, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+            return {}
+        files = data.get("files")
+        return files if isinstance(files, dict) else {}
+
+    def write_cache(self, entries: dict):
+        if self.cache_file is None:
+            return
+        tmp_file = self.cache_file.with_name(self.cache_file.name + ".tmp")
+        try:
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump({"version": CACHE_VERSION, "files": entries}, f)
+            os.replace(tmp_file, self.cache_file)
+        except (OSError, TypeError, ValueError) as e:
+            try:
+                tmp_file.unlink()
+            except OSError:
+                pass
+            logging.warning(f"Unable to write color palette cache {self.cache_file}: {e}")
@@ -4,7 +4,7 @@ import os
 import sys
 import random
 from math import sqrt
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from pathlib import Path
 
 import numpy as np
@@ -18,7 +18,7 @@ from PIL import (
 )
 from tqdm import tqdm
 
-from color_palettes import COLOR_PALETTES
+from palette_registry import PaletteRegistry, hex_to_rgb
 
 Image.MAX_IMAGE_PIXELS = None
 logging.basicConfig(level=logging.INFO, format='%(message)s')
@@ -43,8 +43,16 @@ class BatchPILFX:
         self.src_dir = args.src_dir
         self.dst_dir = args.dst_dir or args.src_dir
         os.makedirs(self.dst_dir, exist_ok=True)
+        self._palettes = None
         self.image_files = self.get_image_files()
 
+    @property
+    def palettes(self) -> PaletteRegistry:
+        """Color palette registry, only loaded when a palette lookup happens."""
+        if self._palettes is None:
+            self._palettes = PaletteRegistry(self.args.palette_dir)
+        return self._palettes
+
     def get_image_files(self) -> List[Path]:
         """Get a list of image files in the provided directory."""
         return [file for file in Path(self.src_dir).iterdir() if file.suffix.lower() in (".jpg", ".jpeg", ".png")]
@@ -91,48 +99,47 @@ class BatchPILFX:
             self.width, self.height = image.size
             return image
    
-    @staticmethod
-    def hex_to_rgb(hex_color):
-        """Convert HEX color value to RGB"""
-        hex_color = hex_color.lstrip('#')
-        try:
-            if len(hex_color) == 6:
-                return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-        except ValueError:
-            pass
-        raise ValueError(f"Invalid hexadecimal color code: {hex_color}")
-    
-    def get_color_values(self, colors_string: str) -> List[str]:
-        """Process a string of HEX colors and return a list"""
-        colors_string_lower = colors_string.lower()
-        
-        if colors_string_lower in [palette.lower() for palette in COLOR_PALETTES]:
-            color_values = COLOR_PALETTES[next(palette for palette in COLOR_PALETTES if palette.lower() == colors_string_lower)]
+    def get_color_values(self, colors_string: str) -> Tuple[List[str], List[Tuple[int, int, int]]]:
+        """
+        Process a string of colors or a color palette name.
+        Returns the color values and the RGB values of the valid colors, shuffled together.
+        """
+        palette = self.palettes.get(colors_string)
+
+        if palette:
+            # Palette colors are parsed once when the registry is loaded
+            colors = list(zip(palette.colors, palette.rgb))
             self.filename_addon += f"_{colors_string.lower()}_colorpalette"
         else:
             color_values = [color.strip() for color in colors_string.split(",")]
+            colors = []
+            for color in color_values:
+                try:
+                    colors.append((color, ImageColor.getrgb(color)))
+                except ValueError:
+                    # Keep the value, halftone accepts "none" as a background color
+                    if color.lower() != "none":
+                        logging.error(f"Invalid color specifier: {color}")
+                    colors.append((color, None))
             colors_string = '_'.join(color[1:] for color in color_values)
             self.filename_addon += f"_colors_{colors_string.lower()}"
-        
+
         if self.shuffle_colors:
-            random.shuffle(color_values)
-        
-        return color_values
+            random.shuffle(colors)
 
-    def quantize_image(self, image: Image, quantize_num_colors: int, set_colors: Optional[str] = None) -> Image:
-        """Reduce amount of colors in image and/or replace colors in the image."""
-        colors = []
+        return [color for color, _ in colors], [rgb for _, rgb in colors if rgb is not None]
+
+    def quantize_image(self, image: Image, quantize_num_colors: int, set_colors: Optional[str] = None,
+                       colors: Optional[List[Tuple[int, int, int]]] = None) -> Image:
+        """
+        Reduce amount of colors in image and/or replace colors in the image.
+        Replacement colors are taken from set_colors unless already resolved RGB colors are provided.
+        """
         image = image.convert("RGB")
-        if set_colors:
-            color_values = self.get_color_values(set_colors)
-            for color in color_values:
-                try:
-                    color = ImageColor.getrgb(color)
-                    colors.append(color)
-                except ValueError:
-                    logging.error(f"Invalid color specifier: {color}")
-        else:
-            color_values = []
+        if colors is None:
+            colors = []
+            if set_colors:
+                _, colors = self.get_color_values(set_colors)
 
         if colors:
             num_colors = len(colors)
@@ -182,11 +189,11 @@ class BatchPILFX:
             avg = total // count
             radius = int((1 - avg / 255) * self.htsample / 2 * self.htprocessing_scale * 0.9)  # Scale up the radius and reduce it to 90% of the block size
             if self.foreground:
-                fill_color = self.hex_to_rgb(self.foreground)  # Use the specified hex color
+                fill_color = hex_to_rgb(self.foreground)  # Use the specified hex color
             elif self.background.lower() == 'image':
                 fill_color = None  # No fill color if the background is an image
             else:
-                fill_color = self.hex_to_rgb(self.background)
+                fill_color = hex_to_rgb(self.background)
 
             # Draw the circle from the center of the block and divide the radius by htprocessing_scale
             if fill_color is not None:
@@ -214,7 +221,7 @@ class BatchPILFX:
         elif self.background is None or self.background == "":
             self.output = Image.new("RGBA", (self.width * self.htscale, self.height * self.htscale))
         else:
-            background_color = self.hex_to_rgb(self.background)
+            background_color = hex_to_rgb(self.background)
             self.output = Image.new("RGB", (self.width * self.htscale, self.height * self.htscale), color=background_color)
 
         self.draw = ImageDraw.Draw(self.output)
@@ -390,7 +397,7 @@ class BatchPILFX:
                     if self.args.htsample != 10:
                         self.htsample = self.args.htsample
 
-                    colors = self.get_color_values(self.args.halftone)
+                    colors, _ = self.get_color_values(self.args.halftone)
                     if len(colors) == 1:
                         foreground = colors[0]
                         background = "None"
@@ -414,10 +421,10 @@ class BatchPILFX:
                         processed_image = self.quantize_image(processed_image, self.args.reduce_colors, self.args.set_colors)
 
                     if self.args.set_colors and self.args.reduce_colors == 0:
-                        colors = self.get_color_values(self.args.set_colors)
-                        self.args.reduce_colors = len(colors)
-                        self.filename_addon += f"_{self.args.reduce_colors}color"
-                        processed_image = self.quantize_image(processed_image, self.args.reduce_colors, self.args.set_colors)
+                        _, colors = self.get_color_values(self.args.set_colors)
+                        if colors:
+                            self.filename_addon += f"_{len(colors)}color"
+                            processed_image = self.quantize_image(processed_image, len(colors), colors=colors)
 
                     if self.args.posterize > 0:
                         self.filename_addon += f"_posterize{self.args.posterize}"
@@ -502,6 +509,7 @@ def parse_arguments() -> argparse.Namespace:
     parser.add_argument('--htsample', type=int, default=10, help='Change halftone sample size')
     parser.add_argument('--shuffle_colors', action='store_true', default=True, help='Colors in --set_colors including color palettes will be shuffled each time.')
     parser.add_argument('--set_colors', default='', help='Custom colors or color palette name to replace existing colors')
+    parser.add_argument('--palette_dir', default='palettes', help='Directory containing additional color palette files (.gpl, .act, .json)')
     parser.add_argument('--set_trans_colors', default='', help='Colors to be made transparent')
 
     args = parser.parse_args()
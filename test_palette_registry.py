@@ -0,0 +1,131 @@
+import json
+import os
+
+from palette_registry import CACHE_FILENAME, CACHE_VERSION, Palette, PaletteRegistry
+
+
+def write_gpl(path, name, colors):
+    lines = ["GIMP Palette", f"Name: {name}", "Columns: 4", "# comment"]
+    lines += [f"{r} {g} {b}\tcolor{i}" for i, (r, g, b) in enumerate(colors)]
+    path.write_text("\n".join(lines) + "\n")
+
+
+def test_gpl_palette(tmp_path):
+    write_gpl(tmp_path / "brand.gpl", "BrandA", [(255, 0, 0), (0, 0, 255)])
+
+    palette = PaletteRegistry(tmp_path).get("BrandA")
+
+    assert palette == Palette("BrandA", ("#FF0000", "#0000FF"), ((255, 0, 0), (0, 0, 255)))
+
+
+def test_act_palette(tmp_path):
+    (tmp_path / "full.act").write_bytes(bytes(range(256)) * 3)
+    # 772 byte files hold the number of used colors in the trailer
+    (tmp_path / "short.act").write_bytes(bytes([10, 20, 30, 40, 50, 60]) + bytes(762) + b"\x00\x02\xff\xff")
+
+    registry = PaletteRegistry(tmp_path)
+
+    full = registry.get("full")
+    assert len(full.rgb) == 256
+    assert full.rgb[0] == (0, 1, 2)
+    assert full.colors[0] == "#000102"
+    assert registry.get("short").rgb == ((10, 20, 30), (40, 50, 60))
+
+
+def test_json_palettes(tmp_path):
+    (tmp_path / "single.json").write_text(json.dumps({"name": "BrandB", "colors": ["#fff", [1, 2, 3]]}))
+    (tmp_path / "unnamed.json").write_text(json.dumps({"colors": ["red"]}))
+    (tmp_path / "many.json").write_text(json.dumps({"BrandC": ["#112233"], "BrandD": ["rgb(1,2,3)"]}))
+
+    registry = PaletteRegistry(tmp_path)
+
+    assert registry.get("BrandB").rgb == ((255, 255, 255), (1, 2, 3))
+    assert registry.get("unnamed").colors == ("#FF0000",)
+    assert registry.get("BrandC").colors == ("#112233",)
+    assert registry.get("BrandD").rgb == ((1, 2, 3),)
+
+
+def test_invalid_files_are_skipped(tmp_path):
+    (tmp_path / "mixed.json").write_text(json.dumps({"colors": ["#000000"], "Other": ["#ffffff"]}))
+    (tmp_path / "badname.json").write_text(json.dumps({"name": 123, "colors": ["#112233"]}))
+    (tmp_path / "bad.gpl").write_text("not a palette\n")
+    (tmp_path / "bad.act").write_bytes(bytes(10))
+    write_gpl(tmp_path / "good.gpl", "Good", [(1, 2, 3)])
+
+    registry = PaletteRegistry(tmp_path)
+
+    assert registry.get("other") is None
+    assert registry.get("mixed") is None
+    assert registry.get("good") is not None
+
+
+def test_get_is_case_insensitive(tmp_path):
+    write_gpl(tmp_path / "brand.gpl", "MyBrand", [(1, 2, 3)])
+
+    registry = PaletteRegistry(tmp_path)
+
+    assert registry.get("mybrand") is registry.get("MYBRAND")
+    assert "MyBrand" in registry
+    assert registry.get("gameboy").name == "GameBoy"
+
+
+def test_file_palette_replaces_builtin(tmp_path):
+    (tmp_path / "cga.json").write_text(json.dumps({"CGA": ["#123456"]}))
+
+    assert PaletteRegistry(tmp_path).get("cga").colors == ("#123456",)
+
+
+def test_cache_is_used_for_unchanged_files(tmp_path):
+    path = tmp_path / "brand.gpl"
+    write_gpl(path, "Brand", [(1, 2, 3)])
+    PaletteRegistry(tmp_path)
+
+    # Replace the cached palette, the cache is used while the file is unchanged
+    cache_file = tmp_path / CACHE_FILENAME
+    cache = json.loads(cache_file.read_text())
+    cache["files"]["brand.gpl"]["palettes"][0]["colors"] = ["#0A0B0C"]
+    cache["files"]["brand.gpl"]["palettes"][0]["rgb"] = [[10, 11, 12]]
+    cache_file.write_text(json.dumps(cache))
+
+    assert PaletteRegistry(tmp_path).get("brand").rgb == ((10, 11, 12),)
+
+
+def test_modified_file_is_reloaded(tmp_path):
+    path = tmp_path / "brand.gpl"
+    write_gpl(path, "Brand", [(1, 2, 3)])
+    assert PaletteRegistry(tmp_path).get("brand").rgb == ((1, 2, 3),)
+
+    write_gpl(path, "Brand", [(4, 5, 6)])
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert PaletteRegistry(tmp_path).get("brand").rgb == ((4, 5, 6),)
+
+
+def test_invalid_cache_falls_back_to_parsing(tmp_path):
+    write_gpl(tmp_path / "brand.gpl", "Brand", [(1, 2, 3)])
+    cache_file = tmp_path / CACHE_FILENAME
+
+    for cache in (
+        "not json",
+        json.dumps({"version": CACHE_VERSION + 1, "files": {}}),
+        json.dumps({"version": CACHE_VERSION, "files": []}),
+        json.dumps({"version": CACHE_VERSION, "files": {"brand.gpl": {"foo": 1}}}),
+    ):
+        cache_file.write_text(cache)
+
+        assert PaletteRegistry(tmp_path).get("brand").rgb == ((1, 2, 3),)
+        assert json.loads(cache_file.read_text())["version"] == CACHE_VERSION
+
+
+def test_cache_entry_with_wrong_shape_is_reparsed(tmp_path):
+    path = tmp_path / "brand.gpl"
+    write_gpl(path, "Brand", [(1, 2, 3)])
+    PaletteRegistry(tmp_path)
+
+    cache_file = tmp_path / CACHE_FILENAME
+    cache = json.loads(cache_file.read_text())
+    cache["files"]["brand.gpl"]["palettes"][0]["colors"] = []
+    cache_file.write_text(json.dumps(cache))
+
+    assert PaletteRegistry(tmp_path).get("brand").rgb == ((1, 2, 3),)